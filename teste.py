@@ -1,9 +1,11 @@
 import streamlit as st
-import streamlit.components.v1 as components
-import json
+import jinja2
+import orjson
 import os
-import textwrap
-from datetime import datetime, timedelta, date
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date
+from functools import lru_cache
+from math import fsum
 from pathlib import Path
 from typing import Dict, Tuple, List
 
@@ -17,12 +19,17 @@ ARQUIVO_EMPRESAS = "empresas_cadastradas.json"
 # FUNÇÕES DE PERSISTÊNCIA
 # ============================================================================
 
-def carregar_empresas() -> Dict:
-    """Carrega as empresas cadastradas do arquivo JSON."""
-    if os.path.exists(ARQUIVO_EMPRESAS):
+@st.cache_data
+def carregar_empresas(mtime: float) -> Dict:
+    """
+    Carrega as empresas cadastradas do arquivo JSON.
+    Recebe o mtime do arquivo como chave de cache: o dict parseado é
+    reaproveitado entre reruns e invalidado quando o arquivo muda.
+    """
+    caminho = Path(ARQUIVO_EMPRESAS)
+    if caminho.exists():
         try:
-            with open(ARQUIVO_EMPRESAS, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return orjson.loads(caminho.read_bytes())
         except Exception as e:
             st.error(f"Erro ao carregar empresas: {e}")
             return {}
@@ -31,8 +38,14 @@ def carregar_empresas() -> Dict:
 def salvar_empresas(empresas: Dict) -> bool:
     """Salva as empresas no arquivo JSON."""
     try:
-        with open(ARQUIVO_EMPRESAS, 'w', encoding='utf-8') as f:
-            json.dump(empresas, f, ensure_ascii=False, indent=2)
+        # Escrita atômica: serializa tudo de uma vez num arquivo temporário
+        # e troca via os.replace, para nunca deixar o JSON pela metade.
+        dados = orjson.dumps(empresas, option=orjson.OPT_INDENT_2)
+        temporario = ARQUIVO_EMPRESAS + ".tmp"
+        with open(temporario, 'wb') as f:
+            f.write(dados)
+        os.replace(temporario, ARQUIVO_EMPRESAS)
+        carregar_empresas.clear()
         return True
     except Exception as e:
         st.error(f"Erro ao salvar empresas: {e}")
@@ -51,22 +64,32 @@ def contar_dias_uteis(data_inicio: date, data_fim: date) -> int:
     if data_inicio > data_fim:
         return 0
 
-    dias_uteis = 0
-    data_atual = data_inicio
+    # Aritmética de ordinais em vez de iterar dia a dia: semanas completas
+    # contribuem 5 dias úteis cada; o resto (0 a 6 dias) é conferido
+    # individualmente a partir do dia da semana inicial.
+    total_dias = (data_fim.toordinal() - data_inicio.toordinal()) + 1
+    inicio_semana = data_inicio.weekday()
+    semanas, resto = divmod(total_dias, 7)
 
-    while data_atual <= data_fim:
-        if data_atual.weekday() < 5:  # Segunda a Sexta
-            dias_uteis += 1
-        data_atual += timedelta(days=1)
+    dias_uteis = semanas * 5
+    dias_uteis += sum(1 for i in range(resto) if (inicio_semana + i) % 7 < 5)
 
     return dias_uteis
 
-def calcular_saldo_final(abatimentos: List[Dict], direitos: List[Dict]) -> Dict:
+def calcular_saldo_final(abatimentos: List[Dict], direitos: List[Dict],
+                         total_abatimentos: float = None,
+                         total_direitos: float = None) -> Dict:
     """
     Calcula o saldo final entre direitos e abatimentos.
+    Totais já acumulados podem ser passados para evitar re-somar as listas
+    a cada clique em "Calcular Saldo".
     """
-    total_valor_abatimentos = sum(p['valor'] for p in abatimentos)
-    total_valor_direitos = sum(p['valor'] for p in direitos)
+    # fsum sobre list comprehension: iteração em C e soma sem acúmulo de
+    # erro de arredondamento nos centavos.
+    total_valor_abatimentos = (total_abatimentos if total_abatimentos is not None
+                               else fsum([p['valor'] for p in abatimentos]))
+    total_valor_direitos = (total_direitos if total_direitos is not None
+                            else fsum([p['valor'] for p in direitos]))
 
     saldo_final = total_valor_direitos - total_valor_abatimentos
 
@@ -76,180 +99,204 @@ def calcular_saldo_final(abatimentos: List[Dict], direitos: List[Dict]) -> Dict:
         'saldo_final': saldo_final
     }
 
+# Troca os separadores en-US -> pt-BR em uma única passada C.
+_TABELA_BR = str.maketrans({',': '.', '.': ','})
+
+@lru_cache(maxsize=4096)
 def formatar_real(valor: float) -> str:
     """Formata número no padrão brasileiro R$ 1.234,56"""
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return "R$ " + f"{valor:,.2f}".translate(_TABELA_BR)
 
 # ============================================================================
 # FUNÇÕES DE RELATÓRIO
 # ============================================================================
 
+# Templates Jinja2 compilados uma única vez na importação do módulo.
+# O bloco por funcionário existe em duas versões: a genérica, com loops,
+# e uma especializada com os loops desenrolados para o formato dominante
+# de exatamente 1 abatimento e 1 direito. autoescape protege os campos
+# digitados pelo usuário (nome, descrição, observação).
+# CSS do relatório compartilhado em assets/ e lido uma única vez na
+# importação; continua embutido no HTML gerado para que o arquivo
+# baixado seja autossuficiente.
+_CSS_RELATORIO = (Path(__file__).parent / "assets" / "relatorio.css").read_text(encoding='utf-8')
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Relatório de Acerto Financeiro</title>
+    <style>
+""" + _CSS_RELATORIO + """    </style>
+</head>
+<body>
+"""
+
+_HTML_TAIL = """</body>
+</html>
+"""
+
+_CALC_SRC = """{% set tot = calc.totais %}
+<div class="relatorio">
+    <div class="info-header">
+        <strong>Funcionário:</strong> {{ calc.nome_funcionario|upper }}<br>
+        <strong>Empresa:</strong> {{ calc.empresa }}
+    </div>
+
+    <table>
+        <!-- ABATIMENTOS -->
+        <thead>
+            <tr>
+                <th colspan="3" class="header-abatidos">VALORES COMPRADOS A SEREM ABATIDOS</th>
+            </tr>
+        </thead>
+        <tbody>
+        {% for item in calc.abatimentos %}
+            <tr>
+                <td class="desc-col">{{ item.descricao }}</td>
+                <td class="detalhe-col">{{ item.detalhes }}</td>
+                <td class="valor-col" style="color: red;">{{ item.valor|formatar_real|safe }}</td>
+            </tr>
+        {% endfor %}
+            <tr class="subtotal-row">
+                <td colspan="2"></td>
+                <td class="valor-col">{{ tot.total_valor_abatimentos|formatar_real|safe }}</td>
+            </tr>
+        </tbody>
+    </table>
+
+    <table>
+        <!-- DIREITOS -->
+        <thead>
+            <tr>
+                <th colspan="3" class="header-direitos">VALORES QUE TEM DIREITO</th>
+            </tr>
+        </thead>
+        <tbody>
+        {% for item in calc.direitos %}
+            <tr>
+                <td class="desc-col">{{ item.descricao }}</td>
+                <td class="detalhe-col">{{ item.dias|safe }} dias de trabalho</td>
+                <td class="valor-col">{{ item.valor|formatar_real|safe }}</td>
+            </tr>
+        {% endfor %}
+            <tr class="subtotal-row-direito">
+                <td colspan="2"></td>
+                <td class="valor-col">{{ tot.total_valor_direitos|formatar_real|safe }}</td>
+            </tr>
+            <tr class="saldo-final-row">
+                <td colspan="2">Valor de direito abatendo o valor pago a maior</td>
+                <td class="valor-col">{{ tot.saldo_final|formatar_real|safe }}</td>
+            </tr>
+            <tr>
+                <td colspan="2" style="text-align: right;">Data de reembolso na conta bancária</td>
+                <td class="valor-col">{{ calc.data_reembolso|default(data_hoje, true) }}</td>
+            </tr>
+        </tbody>
+    </table>
+
+    {% if calc.observacao %}<div style="padding: 10px; font-style: italic;">Obs: {{ calc.observacao }}</div>{% endif %}
+</div>
+"""
+
+_CALC_SINGLE_SRC = """{% set tot = calc.totais %}
+<div class="relatorio">
+    <div class="info-header">
+        <strong>Funcionário:</strong> {{ calc.nome_funcionario|upper }}<br>
+        <strong>Empresa:</strong> {{ calc.empresa }}
+    </div>
+
+    <table>
+        <!-- ABATIMENTOS -->
+        <thead>
+            <tr>
+                <th colspan="3" class="header-abatidos">VALORES COMPRADOS A SEREM ABATIDOS</th>
+            </tr>
+        </thead>
+        <tbody>
+        {% set item = calc.abatimentos[0] %}
+            <tr>
+                <td class="desc-col">{{ item.descricao }}</td>
+                <td class="detalhe-col">{{ item.detalhes }}</td>
+                <td class="valor-col" style="color: red;">{{ item.valor|formatar_real|safe }}</td>
+            </tr>
+            <tr class="subtotal-row">
+                <td colspan="2"></td>
+                <td class="valor-col">{{ tot.total_valor_abatimentos|formatar_real|safe }}</td>
+            </tr>
+        </tbody>
+    </table>
+
+    <table>
+        <!-- DIREITOS -->
+        <thead>
+            <tr>
+                <th colspan="3" class="header-direitos">VALORES QUE TEM DIREITO</th>
+            </tr>
+        </thead>
+        <tbody>
+        {% set item = calc.direitos[0] %}
+            <tr>
+                <td class="desc-col">{{ item.descricao }}</td>
+                <td class="detalhe-col">{{ item.dias|safe }} dias de trabalho</td>
+                <td class="valor-col">{{ item.valor|formatar_real|safe }}</td>
+            </tr>
+            <tr class="subtotal-row-direito">
+                <td colspan="2"></td>
+                <td class="valor-col">{{ tot.total_valor_direitos|formatar_real|safe }}</td>
+            </tr>
+            <tr class="saldo-final-row">
+                <td colspan="2">Valor de direito abatendo o valor pago a maior</td>
+                <td class="valor-col">{{ tot.saldo_final|formatar_real|safe }}</td>
+            </tr>
+            <tr>
+                <td colspan="2" style="text-align: right;">Data de reembolso na conta bancária</td>
+                <td class="valor-col">{{ calc.data_reembolso|default(data_hoje, true) }}</td>
+            </tr>
+        </tbody>
+    </table>
+
+    {% if calc.observacao %}<div style="padding: 10px; font-style: italic;">Obs: {{ calc.observacao }}</div>{% endif %}
+</div>
+"""
+
+_JINJA_ENV = jinja2.Environment(autoescape=True, trim_blocks=True,
+                                lstrip_blocks=True)
+_JINJA_ENV.filters['formatar_real'] = formatar_real
+_CALC_TEMPLATE = _JINJA_ENV.from_string(_CALC_SRC)
+_CALC_SINGLE_TEMPLATE = _JINJA_ENV.from_string(_CALC_SINGLE_SRC)
+
+def _render_calc(calc: Dict, data_hoje: str) -> str:
+    """Renderiza o bloco HTML de um funcionário."""
+    if len(calc['abatimentos']) == 1 and len(calc['direitos']) == 1:
+        template = _CALC_SINGLE_TEMPLATE
+    else:
+        template = _CALC_TEMPLATE
+    return template.render(calc=calc, data_hoje=data_hoje)
+
+@st.cache_data(show_spinner=False, max_entries=8)
 def gerar_html_relatorio(calculos: list) -> str:
-    """Gera o relatório completo em HTML."""
-
-    # CSS e Cabeçalho
-    html = """
-    <!DOCTYPE html>
-    <html lang="pt-BR">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Relatório de Acerto Financeiro</title>
-        <style>
-            body {
-                font-family: 'Arial', sans-serif;
-                max-width: 900px;
-                margin: 20px auto;
-                background: #fff;
-                color: #333;
-            }
-            .relatorio {
-                margin-bottom: 50px;
-                border: 1px solid #ccc;
-                background: #fff;
-            }
-            table {
-                width: 100%;
-                border-collapse: collapse;
-                margin: 0;
-            }
-            th, td {
-                border: 1px solid #000;
-                padding: 5px 10px;
-                font-size: 14px;
-            }
-            .header-abatidos {
-                background-color: red;
-                color: white;
-                text-align: center;
-                font-weight: bold;
-                text-transform: uppercase;
-                padding: 5px;
-            }
-            .header-direitos {
-                background-color: #002060; /* Dark blue */
-                color: white;
-                text-align: center;
-                font-weight: bold;
-                text-transform: uppercase;
-                padding: 5px;
-            }
-            .valor-col {
-                text-align: right;
-                width: 120px;
-                white-space: nowrap;
-            }
-            .desc-col {
-                text-align: left;
-            }
-            .detalhe-col {
-                text-align: center;
-            }
-            .subtotal-row td {
-                text-align: right;
-                font-weight: bold;
-                color: red;
-            }
-            .subtotal-row-direito td {
-                text-align: right;
-                font-weight: bold;
-                color: #000;
-            }
-            .saldo-final-row td {
-                text-align: right;
-                font-weight: bold;
-                background-color: #f9f9f9;
-            }
-            .info-header {
-                padding: 10px;
-                background: #eee;
-                border-bottom: 1px solid #ccc;
-            }
-        </style>
-    </head>
-    <body>
     """
-
-    for calc in calculos:
-        html += f"""
-        <div class="relatorio">
-            <div class="info-header">
-                <strong>Funcionário:</strong> {calc['nome_funcionario'].upper()}<br>
-                <strong>Empresa:</strong> {calc['empresa']}
-            </div>
-
-            <table>
-                <!-- ABATIMENTOS -->
-                <thead>
-                    <tr>
-                        <th colspan="3" class="header-abatidos">VALORES COMPRADOS A SEREM ABATIDOS</th>
-                    </tr>
-                </thead>
-                <tbody>
-        """
-
-        for item in calc['abatimentos']:
-            html += f"""
-                <tr>
-                    <td class="desc-col">{item['descricao']}</td>
-                    <td class="detalhe-col">{item['detalhes']}</td>
-                    <td class="valor-col" style="color: red;">{formatar_real(item['valor'])}</td>
-                </tr>
-            """
-
-        html += f"""
-                <tr class="subtotal-row">
-                    <td colspan="2"></td>
-                    <td class="valor-col">{formatar_real(calc['totais']['total_valor_abatimentos'])}</td>
-                </tr>
-                </tbody>
-            </table>
-
-            <table>
-                <!-- DIREITOS -->
-                <thead>
-                    <tr>
-                        <th colspan="3" class="header-direitos">VALORES QUE TEM DIREITO</th>
-                    </tr>
-                </thead>
-                <tbody>
-        """
-
-        for item in calc['direitos']:
-            html += f"""
-                <tr>
-                    <td class="desc-col">{item['descricao']}</td>
-                    <td class="detalhe-col">{item['dias']} dias de trabalho</td>
-                    <td class="valor-col">{formatar_real(item['valor'])}</td>
-                </tr>
-            """
-
-        html += f"""
-                <tr class="subtotal-row-direito">
-                    <td colspan="2"></td>
-                    <td class="valor-col">{formatar_real(calc['totais']['total_valor_direitos'])}</td>
-                </tr>
-                <tr class="saldo-final-row">
-                    <td colspan="2">Valor de direito abatendo o valor pago a maior</td>
-                    <td class="valor-col">{formatar_real(calc['totais']['saldo_final'])}</td>
-                </tr>
-                <tr>
-                    <td colspan="2" style="text-align: right;">Data de reembolso na conta bancária</td>
-                    <td class="valor-col">{calc.get('data_reembolso', '')}</td>
-                </tr>
-                </tbody>
-            </table>
-
-            {f'<div style="padding: 10px; font-style: italic;">Obs: {calc["observacao"]}</div>' if calc.get('observacao') else ''}
-        </div>
-        """
-
-    html += """
-    </body>
-    </html>
+    Gera o relatório completo em HTML.
+    Cacheado pelo conteúdo de `calculos`: reruns que não alteram a lista
+    (qualquer interação na sidebar) reaproveitam o HTML pronto.
     """
+    # Data padrão de reembolso avaliada uma única vez por render, e não
+    # uma vez por funcionário dentro do loop do template.
+    hoje = date.today()
+    data_hoje = f"{hoje.day:02d}/{hoje.month:02d}/{hoje.year}"
+
+    # Blocos de funcionários são independentes: com vários, o render é
+    # distribuído em threads (executor.map preserva a ordem de entrada).
+    if len(calculos) > 1:
+        with ThreadPoolExecutor(max_workers=min(8, len(calculos))) as executor:
+            fragmentos = list(executor.map(lambda c: _render_calc(c, data_hoje),
+                                           calculos))
+    else:
+        fragmentos = [_render_calc(calc, data_hoje) for calc in calculos]
 
-    return textwrap.dedent(html)
+    return _HTML_HEAD + "".join(fragmentos) + _HTML_TAIL
 
 # ============================================================================
 # INTERFACE
@@ -307,6 +354,27 @@ def renderizar_cadastro_empresas(empresas: Dict):
         for nome, dados in empresas.items():
             st.text(f"• {nome} — {formatar_real(dados['valor_diario'])}/dia")
 
+def _detalhe_abatimento(dias_trabalhados: int, dias_afastamento: int) -> str:
+    # Lógica do detalhe
+    if dias_trabalhados > 0:
+        return f"Atuou {dias_trabalhados} dias - sendo abatido o restante ({dias_afastamento} dias)"
+    return f"Não atuou nenhum dia - sendo abatido todo o valor ({dias_afastamento} dias)"
+
+def _invalidar_ultimo_calculo():
+    # O snapshot referencia as listas temporárias vivas (sem copy): qualquer
+    # item adicionado/editado depois do Calcular deixaria os totais
+    # congelados inconsistentes com as linhas, então ele é descartado.
+    if '_ultimo_calculo' in st.session_state:
+        del st.session_state._ultimo_calculo
+
+def _limpar_abatimentos():
+    st.session_state.abatimentos_temp = []
+    st.session_state.total_abatimentos_temp = 0.0
+
+def _limpar_direitos():
+    st.session_state.direitos_temp = []
+    st.session_state.total_direitos_temp = 0.0
+
 def renderizar_calculo_individual(empresas: Dict):
     """Renderiza a seção de cálculo individual."""
     st.subheader("Cálculo Individual")
@@ -315,11 +383,13 @@ def renderizar_calculo_individual(empresas: Dict):
         st.warning("Cadastre pelo menos uma empresa antes de fazer cálculos")
         return
 
-    # Inicializar listas no session_state
+    # Inicializar listas e totais incrementais no session_state
     if 'abatimentos_temp' not in st.session_state:
         st.session_state.abatimentos_temp = []
+        st.session_state.total_abatimentos_temp = 0.0
     if 'direitos_temp' not in st.session_state:
         st.session_state.direitos_temp = []
+        st.session_state.total_direitos_temp = 0.0
 
     col1, col2 = st.columns(2)
 
@@ -327,7 +397,15 @@ def renderizar_calculo_individual(empresas: Dict):
         nome_funcionario = st.text_input("Nome do Funcionário", placeholder="Ex: João Silva")
 
     with col2:
-        empresa_selecionada = st.selectbox("Empresa", options=list(empresas.keys()))
+        # Tupla de nomes cacheada no session_state para não materializar
+        # uma lista nova a cada rerun; invalida por tamanho/última chave.
+        nomes_empresas = st.session_state.get('_nomes_empresas')
+        if (nomes_empresas is None
+                or len(nomes_empresas) != len(empresas)
+                or nomes_empresas[-1] not in empresas):
+            nomes_empresas = tuple(empresas)
+            st.session_state._nomes_empresas = nomes_empresas
+        empresa_selecionada = st.selectbox("Empresa", options=nomes_empresas)
 
     if empresa_selecionada:
         dados_empresa = empresas[empresa_selecionada]
@@ -353,30 +431,53 @@ def renderizar_calculo_individual(empresas: Dict):
 
                 if submitted_abat:
                     if desc_abatimento:
-                        # Lógica do detalhe
-                        if dias_trab_abat > 0:
-                            detalhe = f"Atuou {dias_trab_abat} dias - sendo abatido o restante ({dias_afast_abat} dias)"
-                        else:
-                            detalhe = f"Não atuou nenhum dia - sendo abatido todo o valor ({dias_afast_abat} dias)"
-
                         item = {
                             'descricao': desc_abatimento,
                             'dias_trabalhados': dias_trab_abat,
                             'dias_afastamento': dias_afast_abat,
-                            'detalhes': detalhe,
+                            'detalhes': _detalhe_abatimento(dias_trab_abat, dias_afast_abat),
+                            # Diária gravada no item: edições futuras repõem o
+                            # valor com a taxa original, não a da empresa
+                            # selecionada no momento.
+                            'valor_diario': valor_diario,
                             'valor': dias_afast_abat * valor_diario
                         }
                         st.session_state.abatimentos_temp.append(item)
+                        st.session_state.total_abatimentos_temp += item['valor']
+                        _invalidar_ultimo_calculo()
                         st.success("Item adicionado!")
-                        st.rerun()
                     else:
                         st.error("Preencha a descrição")
 
         if st.session_state.abatimentos_temp:
-            st.table(st.session_state.abatimentos_temp)
-            if st.button("Limpar Abatimentos"):
-                st.session_state.abatimentos_temp = []
-                st.rerun()
+            # Um único data_editor no lugar de tabela estática: edição e
+            # remoção de linhas em um widget só, sem loops de botões por item.
+            editados = st.data_editor(st.session_state.abatimentos_temp,
+                                      num_rows="dynamic",
+                                      key="editor_abatimentos",
+                                      use_container_width=True,
+                                      disabled=("detalhes", "valor_diario", "valor"))
+            if editados != st.session_state.abatimentos_temp:
+                # Derivados (detalhes/valor) recalculados por linha a partir
+                # dos campos da própria linha; linhas novas sem descrição são
+                # descartadas.
+                itens = []
+                for item in editados:
+                    if not (item.get('descricao') or '').strip():
+                        continue
+                    dias_trab = item.get('dias_trabalhados') or 0
+                    dias_afast = item.get('dias_afastamento') or 0
+                    diaria = item.get('valor_diario') or valor_diario
+                    item['dias_trabalhados'] = dias_trab
+                    item['dias_afastamento'] = dias_afast
+                    item['detalhes'] = _detalhe_abatimento(dias_trab, dias_afast)
+                    item['valor_diario'] = diaria
+                    item['valor'] = dias_afast * diaria
+                    itens.append(item)
+                st.session_state.abatimentos_temp = itens
+                st.session_state.total_abatimentos_temp = fsum([i['valor'] for i in itens])
+                _invalidar_ultimo_calculo()
+            st.button("Limpar Abatimentos", on_click=_limpar_abatimentos)
 
         # ===== SEÇÃO 2: DIREITOS (AZUL) =====
         st.markdown("---")
@@ -397,19 +498,37 @@ def renderizar_calculo_individual(empresas: Dict):
                         item = {
                             'descricao': desc_direito,
                             'dias': dias_direito,
+                            'valor_diario': valor_diario,
                             'valor': dias_direito * valor_diario
                         }
                         st.session_state.direitos_temp.append(item)
+                        st.session_state.total_direitos_temp += item['valor']
+                        _invalidar_ultimo_calculo()
                         st.success("Item adicionado!")
-                        st.rerun()
                     else:
                         st.error("Preencha a descrição e dias")
 
         if st.session_state.direitos_temp:
-            st.table(st.session_state.direitos_temp)
-            if st.button("Limpar Direitos"):
-                st.session_state.direitos_temp = []
-                st.rerun()
+            editados = st.data_editor(st.session_state.direitos_temp,
+                                      num_rows="dynamic",
+                                      key="editor_direitos",
+                                      use_container_width=True,
+                                      disabled=("valor_diario", "valor"))
+            if editados != st.session_state.direitos_temp:
+                itens = []
+                for item in editados:
+                    if not (item.get('descricao') or '').strip():
+                        continue
+                    dias = item.get('dias') or 0
+                    diaria = item.get('valor_diario') or valor_diario
+                    item['dias'] = dias
+                    item['valor_diario'] = diaria
+                    item['valor'] = dias * diaria
+                    itens.append(item)
+                st.session_state.direitos_temp = itens
+                st.session_state.total_direitos_temp = fsum([i['valor'] for i in itens])
+                _invalidar_ultimo_calculo()
+            st.button("Limpar Direitos", on_click=_limpar_direitos)
 
         # ===== RESULTADO E DATA =====
         st.markdown("---")
@@ -430,18 +549,24 @@ def renderizar_calculo_individual(empresas: Dict):
                 else:
                     totais = calcular_saldo_final(
                         st.session_state.abatimentos_temp,
-                        st.session_state.direitos_temp
+                        st.session_state.direitos_temp,
+                        total_abatimentos=st.session_state.total_abatimentos_temp,
+                        total_direitos=st.session_state.total_direitos_temp
                     )
 
                     st.session_state._ultimo_calculo = {
                         'nome_funcionario': nome_funcionario,
                         'empresa': empresa_selecionada,
                         'valor_diario': valor_diario,
-                        'abatimentos': st.session_state.abatimentos_temp.copy(),
-                        'direitos': st.session_state.direitos_temp.copy(),
+                        # Referência direta, sem copy(): qualquer mutação
+                        # posterior dos temporários descarta este snapshot
+                        # via _invalidar_ultimo_calculo.
+                        'abatimentos': st.session_state.abatimentos_temp,
+                        'direitos': st.session_state.direitos_temp,
                         'totais': totais,
                         'observacao': observacao,
-                        'data_reembolso': data_reembolso.strftime('%d/%m/%Y')
+                        # f-string direta evita o parser de formato/locale do strftime
+                        'data_reembolso': f"{data_reembolso.day:02d}/{data_reembolso.month:02d}/{data_reembolso.year}"
                     }
                     st.success("Calculado!")
 
@@ -455,6 +580,8 @@ def renderizar_calculo_individual(empresas: Dict):
                     # Limpar temporários
                     st.session_state.abatimentos_temp = []
                     st.session_state.direitos_temp = []
+                    st.session_state.total_abatimentos_temp = 0.0
+                    st.session_state.total_direitos_temp = 0.0
                     del st.session_state._ultimo_calculo
 
                     st.success("Adicionado ao relatório!")
@@ -466,6 +593,8 @@ def renderizar_calculo_individual(empresas: Dict):
              if st.button("Resetar Tudo", use_container_width=True):
                 st.session_state.abatimentos_temp = []
                 st.session_state.direitos_temp = []
+                st.session_state.total_abatimentos_temp = 0.0
+                st.session_state.total_direitos_temp = 0.0
                 st.session_state.calculos = []
                 if '_ultimo_calculo' in st.session_state:
                     del st.session_state._ultimo_calculo
@@ -481,6 +610,10 @@ def renderizar_calculo_individual(empresas: Dict):
 
 def gerar_relatorio():
     """Gera e exibe o relatório final."""
+    # Import tardio: só esta página usa components, e sys.modules torna as
+    # chamadas seguintes gratuitas. Encurta o cold-start do app.
+    import streamlit.components.v1 as components
+
     st.subheader("Relatório Final")
 
     if 'calculos' not in st.session_state or not st.session_state.calculos:
@@ -492,17 +625,13 @@ def gerar_relatorio():
     # Exibir usando componente HTML isolado para garantir renderização correta
     components.html(html_relatorio, height=600, scrolling=True)
 
-    arquivo_html = Path("relatorio_descontos.html")
-    arquivo_html.write_text(html_relatorio, encoding='utf-8')
-
-    with open(arquivo_html, 'rb') as f:
-        st.download_button(
-            label="Baixar Relatório (HTML)",
-            data=f,
-            file_name=f"relatorio_acerto_{date.today().strftime('%Y%m%d')}.html",
-            mime="text/html",
-            use_container_width=True
-        )
+    st.download_button(
+        label="Baixar Relatório (HTML)",
+        data=html_relatorio.encode('utf-8'),
+        file_name=f"relatorio_acerto_{date.today().strftime('%Y%m%d')}.html",
+        mime="text/html",
+        use_container_width=True
+    )
 
 # ============================================================================
 # APLICAÇÃO PRINCIPAL
@@ -517,7 +646,8 @@ def main():
 
     st.title("Sistema de Cálculo de Acertos/Descontos")
 
-    empresas = carregar_empresas()
+    mtime = os.path.getmtime(ARQUIVO_EMPRESAS) if os.path.exists(ARQUIVO_EMPRESAS) else 0.0
+    empresas = carregar_empresas(mtime)
 
     with st.sidebar:
         st.header("Menu")